@@ -1,7 +1,14 @@
 """Main Gradio application for the Company Brochure Generator MVP."""
 
+import asyncio
+import atexit
+import json
+import logging
 import os
+import queue
 import sys
+import threading
+from logging.handlers import QueueHandler, QueueListener
 
 # Set up library path for WeasyPrint on macOS (if using Homebrew)
 if sys.platform == 'darwin':  # macOS
@@ -18,15 +25,33 @@ import time
 from config import Config
 from services.brochure_service import BrochureService
 from services.export_service import ExportService
+from utils.css import minify_css
 from utils.validators import validate_url, validate_company_name
 
+logger = logging.getLogger(__name__)
 
 # Initialize services
 brochure_service = BrochureService()
 export_service = ExportService()
 
-# Global state for brochure content
-current_brochure = {"content": ""}
+# Custom CSS for the Gradio UI, minified once at import
+_CUSTOM_CSS = minify_css("""
+.container {
+    max-width: 1400px;
+    margin: auto;
+}
+.header {
+    text-align: center;
+    padding: 20px;
+    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+    color: white;
+    border-radius: 10px;
+    margin-bottom: 20px;
+}
+.output-box {
+    min-height: 400px;
+}
+""")
 
 
 def validate_inputs(company_name: str, company_url: str) -> tuple[bool, str]:
@@ -34,7 +59,7 @@ def validate_inputs(company_name: str, company_url: str) -> tuple[bool, str]:
     Validate user inputs.
     
     Returns:
-        Tuple of (is_valid, error_message)
+        Tuple of (is_valid, normalized_url or error_message)
     """
     # Validate company name
     is_valid, error = validate_company_name(company_name)
@@ -42,11 +67,7 @@ def validate_inputs(company_name: str, company_url: str) -> tuple[bool, str]:
         return False, error
     
     # Validate URL
-    is_valid, result = validate_url(company_url)
-    if not is_valid:
-        return False, result
-    
-    return True, ""
+    return validate_url(company_url)
 
 
 def generate_brochure_workflow(
@@ -57,36 +78,42 @@ def generate_brochure_workflow(
     custom_instructions: str,
     temperature: float,
     max_content_length: int,
+    preview_links: list[str],
     progress=gr.Progress()
-) -> Iterator[tuple[str, str]]:
+) -> Iterator[tuple[str, str, str]]:
     """
     Main workflow for generating brochure with progress tracking.
     
+    Links checked in the link preview are used as-is; otherwise the links
+    are selected automatically. The brochure state is only replaced once a
+    brochure completes, so a failed run keeps the last good one exportable.
+    
     Yields:
-        Tuples of (brochure_content, status_message)
+        Tuples of (brochure_content, status_message, brochure_state)
     """
-    global current_brochure
-    
     # Validate inputs
-    is_valid, error = validate_inputs(company_name, company_url)
+    is_valid, result = validate_inputs(company_name, company_url)
     if not is_valid:
-        yield "", f"❌ Error: {error}"
+        yield "", f"❌ Error: {result}", gr.skip()
         return
     
-    # Normalize URL
-    _, normalized_url = validate_url(company_url)
+    normalized_url = result
+    
+    # Reuse the previewed links so link selection is not run again
+    selected_links = [json.loads(link) for link in preview_links] if preview_links else None
     
     try:
         # Initialize
-        yield "", "🚀 Starting brochure generation..."
-        time.sleep(0.5)
+        yield "", "🚀 Starting brochure generation...", gr.skip()
         
         # Progress callback
         def update_progress(message: str, percentage: float):
             progress(percentage, desc=message)
         
-        # Stream brochure generation
-        brochure_content = ""
+        # Stream brochure generation, coalescing chunks into fewer UI updates
+        brochure_parts = []
+        last_update = time.monotonic()
+        chars_since_update = 0
         
         for chunk in brochure_service.generate_brochure(
             company_name=company_name,
@@ -96,18 +123,29 @@ def generate_brochure_workflow(
             custom_instructions=custom_instructions,
             temperature=temperature,
             max_content_length=max_content_length,
-            progress_callback=update_progress
+            progress_callback=update_progress,
+            selected_links=selected_links
         ):
-            brochure_content += chunk
-            current_brochure["content"] = brochure_content
-            yield brochure_content, f"✨ Generating brochure for {company_name}..."
+            brochure_parts.append(chunk)
+            chars_since_update += len(chunk)
+            
+            if (
+                chars_since_update >= Config.STREAM_UPDATE_CHARS
+                or time.monotonic() - last_update >= Config.STREAM_UPDATE_INTERVAL
+            ):
+                brochure_content = "".join(brochure_parts)
+                yield brochure_content, f"✨ Generating brochure for {company_name}...", gr.skip()
+                last_update = time.monotonic()
+                chars_since_update = 0
+        
+        brochure_content = "".join(brochure_parts)
         
         # Final status
-        yield brochure_content, f"✅ Brochure generated successfully for {company_name}!"
+        yield brochure_content, f"✅ Brochure generated successfully for {company_name}!", brochure_content
         
     except Exception as e:
         error_msg = str(e)
-        yield "", f"❌ Error: {error_msg}"
+        yield "", f"❌ Error: {error_msg}", gr.skip()
 
 
 def get_link_preview(company_url: str, progress=gr.Progress()):
@@ -122,7 +160,7 @@ def get_link_preview(company_url: str, progress=gr.Progress()):
     if not is_valid:
         return f"❌ Error: {result}", gr.update(choices=[], value=[])
     
-    _, normalized_url = validate_url(company_url)
+    normalized_url = result
     
     try:
         progress(0.5, desc="Analyzing website links...")
@@ -134,36 +172,46 @@ def get_link_preview(company_url: str, progress=gr.Progress()):
         if not selected_links:
             return "⚠️ No relevant links found", gr.update(choices=[], value=[])
         
-        # Format links for display
+        # Label links for display, keeping the link itself as the value
         link_choices = []
         for link in selected_links:
             link_type = link.get("type", "page")
             link_url = link.get("url", "")
-            link_choices.append(f"{link_type}: {link_url}")
+            link_choices.append((
+                f"{link_type}: {link_url}",
+                json.dumps({"type": link_type, "url": link_url})
+            ))
         
         # Return with all links selected by default
         return f"✅ Found {len(selected_links)} relevant links", gr.update(
             choices=link_choices,
-            value=link_choices  # Pre-select all links
+            value=[value for _, value in link_choices]  # Pre-select all links
         )
         
     except Exception as e:
         return f"❌ Error: {str(e)}", gr.update(choices=[], value=[])
 
 
-def export_as_pdf(company_name: str) -> tuple[str | None, str]:
+def clear_link_preview():
+    """Clear previewed links, which belong to the previous URL."""
+    return "", gr.update(choices=[], value=[])
+
+
+async def export_as_pdf(company_name: str, brochure_content: str) -> tuple[str | None, str]:
     """
-    Export current brochure as PDF.
+    Export the session's brochure as PDF.
     
     Returns:
         Tuple of (file_path or None, status_message)
     """
-    if not current_brochure["content"]:
+    if not brochure_content:
         return None, "❌ No brochure to export. Generate a brochure first."
     
     try:
-        file_path = export_service.export_to_pdf(
-            current_brochure["content"],
+        # Rendering and file writes block, so keep them off the event loop
+        file_path = await asyncio.to_thread(
+            export_service.export_to_pdf,
+            brochure_content,
             company_name
         )
         return file_path, f"✅ PDF exported successfully to '{file_path}'"
@@ -171,19 +219,21 @@ def export_as_pdf(company_name: str) -> tuple[str | None, str]:
         return None, f"❌ Error exporting PDF: {str(e)}"
 
 
-def export_as_html(company_name: str) -> tuple[str | None, str]:
+async def export_as_html(company_name: str, brochure_content: str) -> tuple[str | None, str]:
     """
-    Export current brochure as HTML.
+    Export the session's brochure as HTML.
     
     Returns:
         Tuple of (file_path or None, status_message)
     """
-    if not current_brochure["content"]:
+    if not brochure_content:
         return None, "❌ No brochure to export. Generate a brochure first."
     
     try:
-        file_path = export_service.export_to_html(
-            current_brochure["content"],
+        # Rendering and file writes block, so keep them off the event loop
+        file_path = await asyncio.to_thread(
+            export_service.export_to_html,
+            brochure_content,
             company_name
         )
         return file_path, f"✅ HTML exported successfully to '{file_path}'"
@@ -191,34 +241,36 @@ def export_as_html(company_name: str) -> tuple[str | None, str]:
         return None, f"❌ Error exporting HTML: {str(e)}"
 
 
+def configure_logging() -> QueueListener:
+    """
+    Route log records through a queue so logging never blocks a request thread.
+    
+    Returns:
+        The started listener that writes queued records to stderr
+    """
+    log_queue = queue.SimpleQueue()
+    
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    
+    logging.getLogger().addHandler(QueueHandler(log_queue))
+    listener = QueueListener(log_queue, stream_handler)
+    listener.start()
+    return listener
+
+
 def create_app():
     """Create and configure the Gradio interface."""
     
     # Check API keys
     errors = Config.validate_api_keys()
     if errors:
-        print("⚠️  Warning: " + ", ".join(errors))
+        logger.warning("⚠️  %s", ", ".join(errors))
     
-    # Custom CSS
-    custom_css = """
-    .container {
-        max-width: 1400px;
-        margin: auto;
-    }
-    .header {
-        text-align: center;
-        padding: 20px;
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        border-radius: 10px;
-        margin-bottom: 20px;
-    }
-    .output-box {
-        min-height: 400px;
-    }
-    """
-    
-    with gr.Blocks(css=custom_css, title="Company Brochure Generator") as app:
+    with gr.Blocks(css=_CUSTOM_CSS, title="Company Brochure Generator") as app:
+        # Per-session brochure content used by the export buttons
+        brochure_state = gr.State("")
+        
         # Header
         gr.HTML("""
         <div class="header">
@@ -246,9 +298,10 @@ def create_app():
                 
                 gr.Markdown("### ⚙️ Generation Settings")
                 
+                model_choices = Config.get_model_choices()
                 model = gr.Dropdown(
-                    choices=Config.get_model_choices(),
-                    value=Config.get_model_choices()[1],  # Default to Gemini
+                    choices=model_choices,
+                    value=model_choices[1],  # Default to Gemini
                     label="AI Model",
                     info="Select the language model to use"
                 )
@@ -362,9 +415,10 @@ def create_app():
                 tone,
                 custom_instructions,
                 temperature,
-                max_content_length
+                max_content_length,
+                links_preview
             ],
-            outputs=[brochure_output, status_box]
+            outputs=[brochure_output, status_box, brochure_state]
         )
         
         preview_btn.click(
@@ -373,15 +427,20 @@ def create_app():
             outputs=[link_status, links_preview]
         )
         
+        company_url.change(
+            fn=clear_link_preview,
+            outputs=[link_status, links_preview]
+        )
+        
         export_pdf_btn.click(
             fn=export_as_pdf,
-            inputs=[company_name],
+            inputs=[company_name, brochure_state],
             outputs=[export_file, export_status]
         )
         
         export_html_btn.click(
             fn=export_as_html,
-            inputs=[company_name],
+            inputs=[company_name, brochure_state],
             outputs=[export_file, export_status]
         )
     
@@ -389,8 +448,15 @@ def create_app():
 
 
 if __name__ == "__main__":
+    # Flush queued log records on shutdown
+    atexit.register(configure_logging().stop)
+    
     # Create and launch the app
     app = create_app()
+    
+    # Warm up the PDF renderer while the user fills in the form
+    threading.Thread(target=export_service.preload_pdf_support, daemon=True).start()
+    
     app.launch(
         server_name="0.0.0.0",
         server_port=7860,
@@ -59,16 +59,38 @@ class Config:
         }
     }
     
+    # Precomputed UI choices and display name -> key lookups
+    _MODEL_CHOICES = [model["name"] for model in MODELS.values()]
+    _TONE_CHOICES = [tone["name"] for tone in TONES.values()]
+    _MODEL_KEYS_BY_NAME = {model["name"]: key for key, model in MODELS.items()}
+    _TONE_KEYS_BY_NAME = {tone["name"]: key for key, tone in TONES.items()}
+    
     # Scraper Settings
     MAX_CONTENT_LENGTH = 2000
     MAX_AGGREGATED_CONTENT = 5000
     REQUEST_TIMEOUT = 10
     MAX_RETRIES = 3
     CACHE_TIMEOUT = 300  # 5 minutes
+    CACHE_REVALIDATE_TIMEOUT = 3600  # stale pages with ETag/Last-Modified kept for revalidation
+    CACHE_MAX_ENTRIES = 256  # scraped pages kept in memory
+    SCRAPER_CONCURRENCY = 8  # pages fetched in parallel
+    MAX_DOWNLOAD_BYTES = 1_000_000  # response bodies are truncated past this size
     
     # LLM Settings
     DEFAULT_TEMPERATURE = 0.7
     MAX_TOKENS = 2000
+    BROCHURE_CACHE_SIZE = 64  # completed brochures kept for identical prompts
+    LINK_CACHE_SIZE = 128  # link selections kept for identical pages
+    BROCHURE_REPLAY_CHUNK_SIZE = 256  # characters per chunk when streaming a cached brochure
+    LLM_CONCURRENCY = 8  # max in-flight async LLM requests
+    MAX_BATCH_PROMPT_TOKENS = 32000  # larger link batches fall back to per-site requests
+    MAX_LINKS_FOR_SELECTION = 100  # links per site sent to the link-selection prompt
+    
+    # Provider rate limits applied to async LLM requests (per minute)
+    OPENAI_RPM = 500
+    OPENAI_TPM = 200000
+    GEMINI_RPM = 1000
+    GEMINI_TPM = 1000000
     
     # Export Settings
     PDF_PAGE_SIZE = "A4"
@@ -77,6 +99,8 @@ class Config:
     # UI Settings
     GRADIO_THEME = "soft"
     MAX_FILE_SIZE_MB = 10
+    STREAM_UPDATE_INTERVAL = 0.08  # seconds between streamed UI updates
+    STREAM_UPDATE_CHARS = 512  # or sooner once this many new characters arrive
     
     @classmethod
     def validate_api_keys(cls):
@@ -94,25 +118,19 @@ class Config:
     @classmethod
     def get_model_choices(cls):
         """Get list of model names for UI dropdown."""
-        return [model["name"] for model in cls.MODELS.values()]
+        return cls._MODEL_CHOICES
     
     @classmethod
     def get_tone_choices(cls):
         """Get list of tone names for UI dropdown."""
-        return [tone["name"] for tone in cls.TONES.values()]
+        return cls._TONE_CHOICES
     
     @classmethod
     def get_model_key_by_name(cls, model_name):
         """Get model key from display name."""
-        for key, value in cls.MODELS.items():
-            if value["name"] == model_name:
-                return key
-        return cls.GEMINI_MODEL  # Default
+        return cls._MODEL_KEYS_BY_NAME.get(model_name, cls.GEMINI_MODEL)
     
     @classmethod
     def get_tone_key_by_name(cls, tone_name):
         """Get tone key from display name."""
-        for key, value in cls.TONES.items():
-            if value["name"] == tone_name:
-                return key
-        return "professional"  # Default
\ No newline at end of file
+        return cls._TONE_KEYS_BY_NAME.get(tone_name, "professional")
\ No newline at end of file
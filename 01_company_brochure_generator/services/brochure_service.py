@@ -1,10 +1,17 @@
 """Core brochure generation service that orchestrates the workflow."""
 
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
 from typing import Callable, Iterator, Optional
 from services.scraper_service import ScraperService
 from services.llm_service import LLMService
 from config import Config
 
+logger = logging.getLogger(__name__)
+
 
 class BrochureService:
     """Service for orchestrating the brochure generation workflow."""
@@ -13,6 +20,45 @@ class BrochureService:
         """Initialize the brochure service."""
         self.scraper = ScraperService()
         self.llm = LLMService()
+        # LRU cache of link selections keyed by (url, digest of the page's links)
+        self.link_cache: OrderedDict[tuple[str, str], tuple[list[dict], float]] = OrderedDict()
+        self._link_cache_lock = threading.Lock()
+    
+    def _select_relevant_links(self, url: str, links: list[str]) -> list[dict]:
+        """
+        Select relevant links, reusing a recent LLM selection for the same page.
+        
+        Args:
+            url: The main website URL
+            links: List of links found on the page
+            
+        Returns:
+            List of dictionaries with 'type' and 'url' keys
+        """
+        key = (url, hashlib.blake2b("\0".join(links).encode(), digest_size=16).hexdigest())
+        
+        with self._link_cache_lock:
+            entry = self.link_cache.get(key)
+            if entry is not None:
+                selected_links, timestamp = entry
+                if time.time() - timestamp < Config.CACHE_TIMEOUT:
+                    self.link_cache.move_to_end(key)
+                    return selected_links
+                # Remove expired cache entry
+                self.link_cache.pop(key, None)
+        
+        # The LLM call runs outside the lock so other sessions are not blocked
+        selected_links = self.llm.select_relevant_links(url, links)
+        
+        # Only cache successful selections so failures are retried
+        if selected_links:
+            with self._link_cache_lock:
+                self.link_cache[key] = (selected_links, time.time())
+                self.link_cache.move_to_end(key)
+                if len(self.link_cache) > Config.LINK_CACHE_SIZE:
+                    self.link_cache.popitem(last=False)
+        
+        return selected_links
     
     def generate_brochure(
         self,
@@ -59,32 +105,53 @@ class BrochureService:
                 if progress_callback:
                     progress_callback("Analyzing and selecting relevant links...", 0.3)
                 
-                selected_links = self.llm.select_relevant_links(url, links)
+                selected_links = self._select_relevant_links(url, links)
             
             # Step 3: Fetch content from selected links
             if progress_callback:
                 progress_callback(f"Fetching content from {len(selected_links)} relevant pages...", 0.5)
             
             # Build aggregated content
-            aggregated_content = f"## Landing Page:\n\n{main_content}\n\n## Relevant Pages:\n\n"
-            
-            for link_info in selected_links:
-                link_url = link_info.get("url", "")
-                link_type = link_info.get("type", "page")
+            content_parts = [f"## Landing Page:\n\n{main_content}\n\n## Relevant Pages:\n\n"]
+            
+            content_length = len(content_parts[0])
+            
+            # Fetch selected pages concurrently on the scraper's worker pool,
+            # keeping the original order. Pages are submitted in waves sized to
+            # the remaining content budget so we stop scraping once enough
+            # content has been collected.
+            pending_links = [
+                (link_info.get("url", ""), link_info.get("type", "page"))
+                for link_info in selected_links
+                if link_info.get("url", "")
+            ]
+            
+            while pending_links and content_length < max_content_length:
+                remaining = max_content_length - content_length
+                wave_size = max(1, -(-remaining // Config.MAX_CONTENT_LENGTH))
+                wave, pending_links = pending_links[:wave_size], pending_links[wave_size:]
+                
+                futures = [
+                    self.scraper.executor.submit(
+                        self.scraper.fetch_website_content_and_links,
+                        link_url,
+                        only_content=True
+                    )
+                    for link_url, _ in wave
+                ]
                 
-                if link_url:
+                for (link_url, link_type), future in zip(wave, futures):
                     try:
-                        content, _ = self.scraper.fetch_website_content_and_links(
-                            link_url, 
-                            only_content=True
-                        )
-                        aggregated_content += f"\n### {link_type.title()}\n{content}\n"
+                        content, _ = future.result()
+                        section = f"\n### {link_type.title()}\n{content}\n"
+                        content_parts.append(section)
+                        content_length += len(section)
                     except Exception as e:
-                        print(f"Warning: Failed to fetch {link_url}: {str(e)}")
+                        logger.warning("Failed to fetch %s: %s", link_url, e)
                         continue
             
-            # Truncate if too long
-            aggregated_content = aggregated_content[:max_content_length]
+            # Join once and truncate if too long
+            aggregated_content = "".join(content_parts)[:max_content_length]
             
             # Step 4: Generate brochure with streaming
             if progress_callback:
@@ -132,7 +199,7 @@ class BrochureService:
                 return [], "No links found on the page"
             
             # Get LLM suggestions
-            selected_links = self.llm.select_relevant_links(url, links)
+            selected_links = self._select_relevant_links(url, links)
             
             if not selected_links:
                 return [], "No relevant links identified"
@@ -143,5 +210,8 @@ class BrochureService:
             return [], f"Error getting link suggestions: {str(e)}"
     
     def clear_cache(self):
-        """Clear the scraper cache."""
-        self.scraper.clear_cache()
\ No newline at end of file
+        """Clear the scraper, link selection and generated brochure caches."""
+        self.scraper.clear_cache()
+        with self._link_cache_lock:
+            self.link_cache.clear()
+        self.llm.clear_cache()
\ No newline at end of file
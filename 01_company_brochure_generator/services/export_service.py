@@ -1,37 +1,29 @@
 """Export service for generating PDF and HTML files from brochure content."""
 
 import os
+import re
+import threading
 from datetime import datetime
+from functools import lru_cache
 from typing import Optional
-import markdown2
+from markdown_it import MarkdownIt
 
+from utils.css import minify_css
 
-class ExportService:
-    """Service for exporting brochures to various formats."""
-    
-    def __init__(self):
-        """Initialize the export service."""
-        # Get the directory where this file is located
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        # Go up one level to the app directory
-        app_dir = os.path.dirname(current_dir)
-        # Create exports directory in the app directory
-        self.exports_dir = os.path.join(app_dir, "exports")
-        os.makedirs(self.exports_dir, exist_ok=True)
-    
-    def _get_html_template(self, company_name: str, content_html: str) -> str:
-        """
-        Get HTML template with embedded CSS.
-        
-        Args:
-            company_name: Name of the company
-            content_html: HTML content of the brochure
-            
-        Returns:
-            Complete HTML document
-        """
-        css = """
-        <style>
+
+# Shared CommonMark renderer with GitHub-style tables
+_MD = MarkdownIt("commonmark").enable("table")
+
+# Characters dropped when building heading ids
+_HEADER_ID_STRIP = re.compile(r"[^\w\s-]")
+_HEADER_ID_SPACES = re.compile(r"[\s-]+")
+
+# Characters not allowed in generated export filenames
+_UNSAFE_FILENAME_CHARS = re.compile(r"[^\w \-]")
+
+
+# Static stylesheet rules shared by every exported document, minified once at import
+_CSS_RULES = minify_css("""
             body {
                 font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen, Ubuntu, Cantarell, sans-serif;
                 line-height: 1.6;
@@ -94,12 +86,13 @@ class ExportService:
                     padding: 20px;
                 }
             }
-        </style>
-        """
-        
-        current_date = datetime.now().strftime("%d %B, %Y")
-        
-        html = f"""<!DOCTYPE html>
+""")
+
+# Stylesheet embedded in exported HTML documents
+_CSS = "<style>" + _CSS_RULES + "</style>"
+
+# Document scaffold around the stylesheet and brochure content
+_HTML_HEAD_FMT = """<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
@@ -107,7 +100,9 @@ class ExportService:
     <meta name="description" content="Company brochure for {company_name}">
     <meta name="generator" content="Company Brochure Generator">
     <title>{company_name} - Company Brochure</title>
-    {css}
+    """
+
+_HTML_BODY_OPEN_FMT = """
 </head>
 <body>
     <div class="container">
@@ -115,7 +110,9 @@ class ExportService:
             <h1>{company_name}</h1>
             <p><em>Company Brochure</em></p>
         </div>
-        {content_html}
+        """
+
+_HTML_FOOT_FMT = """
         <div class="footer">
             <p>Generated on {current_date}</p>
             <p>Created with Company Brochure Generator</p>
@@ -123,8 +120,113 @@ class ExportService:
     </div>
 </body>
 </html>"""
+
+
+# WeasyPrint (HTML class, parsed stylesheet), loaded on first use; False if unavailable
+_weasyprint = None
+_weasyprint_lock = threading.Lock()
+
+
+def _header_id(text: str) -> str:
+    """Build a URL-friendly id for a heading from its text."""
+    slug = _HEADER_ID_STRIP.sub("", text).strip().lower()
+    return _HEADER_ID_SPACES.sub("-", slug)
+
+
+def _sanitize_filename(name: str) -> str:
+    """Keep only alphanumerics, spaces, hyphens and underscores from a name."""
+    return _UNSAFE_FILENAME_CHARS.sub("", name).rstrip()
+
+
+def _load_weasyprint() -> Optional[tuple]:
+    """
+    Import WeasyPrint once and parse the export stylesheet for it.
+    
+    The import is slow (it loads cairo, pango and fontconfig), so it is deferred
+    until first needed and memoized. WeasyPrint is optional; without it PDF
+    exports fall back to HTML.
+    
+    Returns:
+        Tuple of (HTML class, parsed stylesheet) or None if WeasyPrint is unavailable
+    """
+    global _weasyprint
+    if _weasyprint is None:
+        with _weasyprint_lock:
+            if _weasyprint is None:
+                try:
+                    from weasyprint import CSS, HTML
+                    _weasyprint = (HTML, CSS(string=_CSS_RULES))
+                except (ImportError, OSError):
+                    _weasyprint = False
+    return _weasyprint or None
+
+
+@lru_cache(maxsize=4)
+def _render_markdown(markdown_content: str) -> str:
+    """
+    Convert markdown to HTML, memoized so repeated exports skip the markdown pass.
+    
+    Args:
+        markdown_content: Brochure content in markdown format
+        
+    Returns:
+        HTML fragment for the brochure body
+    """
+    tokens = _MD.parse(markdown_content)
+    
+    # Add ids to headings so sections can be linked to; repeated headings
+    # get a numeric suffix ("-2", "-3", ...) to keep ids unique
+    id_counts: dict[str, int] = {}
+    for i, token in enumerate(tokens):
+        if token.type == "heading_open":
+            header_id = _header_id(tokens[i + 1].content)
+            id_counts[header_id] = id_counts.get(header_id, 0) + 1
+            if id_counts[header_id] > 1:
+                header_id = f"{header_id}-{id_counts[header_id]}"
+            token.attrSet("id", header_id)
+    
+    return _MD.renderer.render(tokens, _MD.options, {})
+
+
+class ExportService:
+    """Service for exporting brochures to various formats."""
+    
+    def __init__(self):
+        """Initialize the export service."""
+        # Get the directory where this file is located
+        current_dir = os.path.dirname(os.path.abspath(__file__))
+        # Go up one level to the app directory
+        app_dir = os.path.dirname(current_dir)
+        # Create exports directory in the app directory
+        self.exports_dir = os.path.join(app_dir, "exports")
+        os.makedirs(self.exports_dir, exist_ok=True)
+    
+    def _get_html_template(
+        self,
+        company_name: str,
+        content_html: str,
+        embed_css: bool = True
+    ) -> str:
+        """
+        Get HTML template with embedded CSS.
+        
+        Args:
+            company_name: Name of the company
+            content_html: HTML content of the brochure
+            embed_css: If False, leave out the stylesheet (e.g. when it is applied separately)
+            
+        Returns:
+            Complete HTML document
+        """
+        current_date = datetime.now().strftime("%d %B, %Y")
         
-        return html
+        return "".join([
+            _HTML_HEAD_FMT.format(company_name=company_name),
+            _CSS if embed_css else "",
+            _HTML_BODY_OPEN_FMT.format(company_name=company_name),
+            content_html,
+            _HTML_FOOT_FMT.format(current_date=current_date),
+        ])
     
     def export_to_html(
         self,
@@ -145,17 +247,14 @@ class ExportService:
         """
         try:
             # Convert markdown to HTML
-            content_html = markdown2.markdown(
-                markdown_content,
-                extras=["fenced-code-blocks", "tables", "header-ids"]
-            )
+            content_html = _render_markdown(markdown_content)
             
             # Get complete HTML document
             html = self._get_html_template(company_name, content_html)
             
             # Generate filename
             if not filename:
-                safe_name = "".join(c for c in company_name if c.isalnum() or c in (' ', '-', '_')).rstrip()
+                safe_name = _sanitize_filename(company_name)
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
                 filename = f"{safe_name}_{timestamp}.html"
             
@@ -188,36 +287,37 @@ class ExportService:
         """
         try:
             # First convert to HTML
-            content_html = markdown2.markdown(
-                markdown_content,
-                extras=["fenced-code-blocks", "tables", "header-ids"]
-            )
-            
-            html = self._get_html_template(company_name, content_html)
+            content_html = _render_markdown(markdown_content)
             
             # Generate filename
             if not filename:
-                safe_name = "".join(c for c in company_name if c.isalnum() or c in (' ', '-', '_')).rstrip()
+                safe_name = _sanitize_filename(company_name)
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
                 filename = f"{safe_name}_{timestamp}.pdf"
             
             filepath = os.path.join(self.exports_dir, filename)
             
-            # Try to import weasyprint
-            try:
-                from weasyprint import HTML
-                HTML(string=html).write_pdf(filepath)
+            weasyprint = _load_weasyprint()
+            if weasyprint:
+                HTML, stylesheet = weasyprint
+                html = self._get_html_template(company_name, content_html, embed_css=False)
+                HTML(string=html).write_pdf(filepath, stylesheets=[stylesheet])
                 return filepath
-            except ImportError:
-                # Fallback: save as HTML if weasyprint not available
-                html_path = filepath.replace('.pdf', '.html')
-                with open(html_path, 'w', encoding='utf-8') as f:
-                    f.write(html)
-                return html_path + " (PDF generation requires weasyprint - saved as HTML instead)"
+            
+            # Fallback: save as HTML if weasyprint not available
+            html = self._get_html_template(company_name, content_html)
+            html_path = filepath.replace('.pdf', '.html')
+            with open(html_path, 'w', encoding='utf-8') as f:
+                f.write(html)
+            return html_path + " (PDF generation requires weasyprint - saved as HTML instead)"
                 
         except Exception as e:
             raise Exception(f"Error exporting to PDF: {str(e)}")
     
+    def preload_pdf_support(self):
+        """Import WeasyPrint ahead of the first PDF export."""
+        _load_weasyprint()
+    
     def get_exports_directory(self) -> str:
         """Get the path to the exports directory."""
         return os.path.abspath(self.exports_dir)
\ No newline at end of file
@@ -1,17 +1,28 @@
 """LLM service for the Company Brochure Generator."""
 
-import json
+import asyncio
+import hashlib
+import logging
+import threading
+import weakref
+from collections import OrderedDict
 from typing import Iterator, Optional
-from openai import OpenAI
+import orjson
+from openai import AsyncOpenAI, OpenAI, RateLimitError
 
 from config import Config
+from utils.rate_limiter import AsyncTokenBucket
 from utils.prompts import (
     LINK_SELECTION_SYSTEM_PROMPT,
+    BATCH_LINK_SELECTION_SYSTEM_PROMPT,
     get_link_selection_user_prompt,
+    get_batch_link_selection_user_prompt,
     get_brochure_system_prompt,
     get_brochure_user_prompt
 )
 
+logger = logging.getLogger(__name__)
+
 
 class LLMService:
     """Service for interacting with LLM APIs (OpenAI and Gemini)."""
@@ -23,6 +34,99 @@ class LLMService:
             api_key=Config.GOOGLE_API_KEY,
             base_url=Config.GEMINI_BASE_URL
         )
+        
+        # Async clients for issuing many requests concurrently; retries are handled
+        # by _create_completion_async so every attempt goes through the rate limiters
+        self.async_openai_client = AsyncOpenAI(api_key=Config.OPENAI_API_KEY, max_retries=0)
+        self.async_gemini_client = AsyncOpenAI(
+            api_key=Config.GOOGLE_API_KEY,
+            base_url=Config.GEMINI_BASE_URL,
+            max_retries=0
+        )
+        # Bounds the number of in-flight async requests; asyncio primitives bind
+        # to one event loop, so each running loop gets its own semaphore
+        self._async_semaphores: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, asyncio.Semaphore
+        ] = weakref.WeakKeyDictionary()
+        # Per-provider (requests/min, tokens/min) buckets for async requests
+        self.rate_limiters = {
+            "openai": (
+                AsyncTokenBucket(Config.OPENAI_RPM, Config.OPENAI_RPM),
+                AsyncTokenBucket(Config.OPENAI_TPM, Config.OPENAI_TPM)
+            ),
+            "gemini": (
+                AsyncTokenBucket(Config.GEMINI_RPM, Config.GEMINI_RPM),
+                AsyncTokenBucket(Config.GEMINI_TPM, Config.GEMINI_TPM)
+            )
+        }
+        
+        # LRU cache of completed brochures keyed by a hash of the full request
+        self.brochure_cache: OrderedDict[str, str] = OrderedDict()
+        self._brochure_cache_lock = threading.Lock()
+    
+    def _get_async_semaphore(self) -> asyncio.Semaphore:
+        """Get the concurrency semaphore for the running event loop, creating it on first use."""
+        loop = asyncio.get_running_loop()
+        semaphore = self._async_semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._async_semaphores[loop] = asyncio.Semaphore(Config.LLM_CONCURRENCY)
+        return semaphore
+    
+    def _get_cached_brochure(self, key: str) -> Optional[str]:
+        """
+        Get a previously generated brochure and mark it as recently used.
+        
+        Args:
+            key: The request hash
+            
+        Returns:
+            Cached brochure content or None if not cached
+        """
+        with self._brochure_cache_lock:
+            if key in self.brochure_cache:
+                self.brochure_cache.move_to_end(key)
+                return self.brochure_cache[key]
+        return None
+    
+    def _add_brochure_to_cache(self, key: str, content: str):
+        """
+        Cache a generated brochure, evicting the least recently used entry if full.
+        
+        Args:
+            key: The request hash
+            content: The generated brochure content
+        """
+        with self._brochure_cache_lock:
+            self.brochure_cache[key] = content
+            self.brochure_cache.move_to_end(key)
+            if len(self.brochure_cache) > Config.BROCHURE_CACHE_SIZE:
+                self.brochure_cache.popitem(last=False)
+    
+    @staticmethod
+    def _brochure_cache_key(model_key: str, temperature: float, messages: list[dict]) -> str:
+        """Hash everything that determines a brochure request."""
+        parts = [model_key, str(temperature)] + [message["content"] for message in messages]
+        return hashlib.blake2b("\0".join(parts).encode(), digest_size=16).hexdigest()
+    
+    @staticmethod
+    def _build_brochure_messages(
+        company_name: str,
+        content: str,
+        tone: str,
+        custom_instructions: str
+    ) -> list[dict]:
+        """Build the chat messages for a brochure request."""
+        return [
+            {"role": "system", "content": get_brochure_system_prompt(tone)},
+            {"role": "user", "content": get_brochure_user_prompt(
+                company_name, content, custom_instructions
+            )}
+        ]
+    
+    def clear_cache(self):
+        """Clear cached brochures."""
+        with self._brochure_cache_lock:
+            self.brochure_cache.clear()
     
     def _get_client(self, model_key: str) -> OpenAI:
         """
@@ -42,6 +146,24 @@ class LLMService:
         else:
             return self.gemini_client
     
+    def _get_async_client(self, model_key: str) -> AsyncOpenAI:
+        """
+        Get the appropriate async client based on model.
+        
+        Args:
+            model_key: The model key (e.g., 'gpt-5-nano' or 'gemini-2.5-flash')
+            
+        Returns:
+            AsyncOpenAI client instance
+        """
+        model_info = Config.MODELS.get(model_key, Config.MODELS[Config.GEMINI_MODEL])
+        provider = model_info["provider"]
+        
+        if provider == "openai":
+            return self.async_openai_client
+        else:
+            return self.async_gemini_client
+    
     def select_relevant_links(
         self,
         url: str,
@@ -76,15 +198,83 @@ class LLMService:
             
             result = response.choices[0].message.content
             if result:
-                parsed = json.loads(result)
+                parsed = orjson.loads(result)
                 return parsed.get("links", [])
             
             return []
             
         except Exception as e:
-            print(f"Error selecting links: {str(e)}")
+            logger.warning("Error selecting links: %s", e)
             return []
     
+    def select_relevant_links_batch(
+        self,
+        sites: list[tuple[str, list[str]]]
+    ) -> list[list[dict]]:
+        """
+        Use LLM to select relevant links for several websites in one request.
+        
+        One round-trip replaces one request per site and the system prompt is
+        sent once. Falls back to per-site requests if the combined prompt is
+        too large or the batched response cannot be parsed, and for any site
+        the batched response leaves out. Meant for callers handling several
+        companies at once; the single-site brochure workflow does not use it.
+        
+        Args:
+            sites: List of (website URL, links found on the page) tuples
+            
+        Returns:
+            List of selected links per site, in the same order as `sites`
+        """
+        results: list[list[dict]] = [[] for _ in sites]
+        
+        # Sites without links never need the LLM
+        pending = [(i, site) for i, site in enumerate(sites) if site[1]]
+        if not pending:
+            return results
+        
+        user_prompt = get_batch_link_selection_user_prompt([site for _, site in pending])
+        
+        # Rough estimate: ~4 characters per token
+        if len(pending) == 1 or len(user_prompt) // 4 > Config.MAX_BATCH_PROMPT_TOKENS:
+            for i, (url, links) in pending:
+                results[i] = self.select_relevant_links(url, links)
+            return results
+        
+        # Positions in `pending` that the batched response answered
+        answered: set[int] = set()
+        
+        try:
+            # Always use Gemini for link selection (cheaper and good at structured output)
+            response = self.gemini_client.chat.completions.create(
+                model=Config.GEMINI_MODEL,
+                messages=[
+                    {"role": "system", "content": BATCH_LINK_SELECTION_SYSTEM_PROMPT},
+                    {"role": "user", "content": user_prompt}
+                ],
+                response_format={"type": "json_object"}
+            )
+            
+            result = response.choices[0].message.content
+            parsed = orjson.loads(result) if result else {}
+            
+            # Demultiplex by the 1-based site number used in the prompt
+            for site in parsed.get("sites", []):
+                index = site.get("index")
+                if isinstance(index, int) and 1 <= index <= len(pending):
+                    results[pending[index - 1][0]] = site.get("links", [])
+                    answered.add(index - 1)
+            
+        except Exception as e:
+            logger.warning("Error selecting links in batch, falling back to per-site requests: %s", e)
+        
+        # Sites missing from the batched response are selected one by one
+        for position, (i, (url, links)) in enumerate(pending):
+            if position not in answered:
+                results[i] = self.select_relevant_links(url, links)
+        
+        return results
+    
     def generate_brochure(
         self,
         company_name: str,
@@ -109,21 +299,26 @@ class LLMService:
             Generated brochure content
         """
         try:
+            messages = self._build_brochure_messages(company_name, content, tone, custom_instructions)
+            
+            # Identical requests are served from the cache without calling the API
+            cache_key = self._brochure_cache_key(model_key, temperature, messages)
+            cached = self._get_cached_brochure(cache_key)
+            if cached is not None:
+                return cached
+            
             client = self._get_client(model_key)
             
             response = client.chat.completions.create(
                 model=model_key,
-                messages=[
-                    {"role": "system", "content": get_brochure_system_prompt(tone)},
-                    {"role": "user", "content": get_brochure_user_prompt(
-                        company_name, content, custom_instructions
-                    )}
-                ],
+                messages=messages,
                 temperature=temperature,
                 max_tokens=Config.MAX_TOKENS
             )
             
             result = response.choices[0].message.content
+            if result:
+                self._add_brochure_to_cache(cache_key, result)
             return result if result else ""
             
         except Exception as e:
@@ -153,24 +348,188 @@ class LLMService:
             Chunks of generated content
         """
         try:
+            messages = self._build_brochure_messages(company_name, content, tone, custom_instructions)
+            
+            # Identical requests are replayed from the cache in slices, keeping the streaming UX
+            cache_key = self._brochure_cache_key(model_key, temperature, messages)
+            cached = self._get_cached_brochure(cache_key)
+            if cached is not None:
+                chunk_size = Config.BROCHURE_REPLAY_CHUNK_SIZE
+                for start in range(0, len(cached), chunk_size):
+                    yield cached[start:start + chunk_size]
+                return
+            
             client = self._get_client(model_key)
             
             stream = client.chat.completions.create(
                 model=model_key,
-                messages=[
-                    {"role": "system", "content": get_brochure_system_prompt(tone)},
-                    {"role": "user", "content": get_brochure_user_prompt(
-                        company_name, content, custom_instructions
-                    )}
-                ],
+                messages=messages,
                 temperature=temperature,
                 max_tokens=Config.MAX_TOKENS,
                 stream=True
             )
             
+            parts = []
             for chunk in stream:
-                if chunk.choices[0].delta.content:
-                    yield chunk.choices[0].delta.content
+                # Some providers send chunks without choices (e.g. usage-only chunks)
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    yield delta
+            
+            # Only complete, non-empty streams are cached
+            if parts:
+                self._add_brochure_to_cache(cache_key, "".join(parts))
+                    
+        except Exception as e:
+            raise Exception(f"Error generating brochure stream: {str(e)}")
+    
+    async def _create_completion_async(
+        self,
+        client: AsyncOpenAI,
+        provider: str,
+        **kwargs
+    ):
+        """
+        Create a chat completion within the provider's rate limits.
+        
+        Waits for request and token budget before calling the API. If the
+        server still answers 429, both buckets are drained so concurrent
+        callers back off too, and the call is retried after Retry-After.
+        
+        Args:
+            client: The async client to use
+            provider: The provider whose rate limits apply ('openai' or 'gemini')
+            **kwargs: Arguments for chat.completions.create
+            
+        Returns:
+            The chat completion response
+        """
+        requests_bucket, tokens_bucket = self.rate_limiters[provider]
+        
+        # Rough estimate: ~4 characters per token, plus the requested completion
+        prompt_chars = sum(len(message["content"]) for message in kwargs["messages"])
+        token_estimate = prompt_chars // 4 + kwargs.get("max_tokens", 0)
+        
+        for attempt in range(Config.MAX_RETRIES):
+            await requests_bucket.acquire()
+            await tokens_bucket.acquire(token_estimate)
+            
+            try:
+                async with self._get_async_semaphore():
+                    return await client.chat.completions.create(**kwargs)
                     
+            except RateLimitError as e:
+                if attempt == Config.MAX_RETRIES - 1:
+                    raise
+                
+                requests_bucket.drain()
+                tokens_bucket.drain()
+                
+                try:
+                    delay = float(e.response.headers.get("retry-after", ""))
+                except ValueError:
+                    delay = 2 ** attempt  # Exponential backoff
+                await asyncio.sleep(delay)
+    
+    async def select_relevant_links_async(
+        self,
+        url: str,
+        links: list[str]
+    ) -> list[dict]:
+        """
+        Use LLM to select relevant links from a list, without blocking the event loop.
+        
+        Args:
+            url: The main website URL
+            links: List of links found on the page
+            
+        Returns:
+            List of dictionaries with 'type' and 'url' keys
+        """
+        if not links:
+            return []
+        
+        try:
+            # Always use Gemini for link selection (cheaper and good at structured output)
+            client = self.async_gemini_client
+            model = Config.GEMINI_MODEL
+            
+            response = await self._create_completion_async(
+                client,
+                "gemini",
+                model=model,
+                messages=[
+                    {"role": "system", "content": LINK_SELECTION_SYSTEM_PROMPT},
+                    {"role": "user", "content": get_link_selection_user_prompt(url, links)}
+                ],
+                response_format={"type": "json_object"}
+            )
+            
+            result = response.choices[0].message.content
+            if result:
+                parsed = orjson.loads(result)
+                return parsed.get("links", [])
+            
+            return []
+            
+        except Exception as e:
+            logger.warning("Error selecting links: %s", e)
+            return []
+    
+    async def generate_brochure_async(
+        self,
+        company_name: str,
+        content: str,
+        model_key: str,
+        tone: str = "professional",
+        custom_instructions: str = "",
+        temperature: float = 0.7
+    ) -> str:
+        """
+        Generate brochure content without blocking the event loop.
+        
+        Several brochures can be generated concurrently with asyncio.gather;
+        at most Config.LLM_CONCURRENCY requests are in flight at once.
+        
+        Args:
+            company_name: Name of the company
+            content: Aggregated content from website pages
+            model_key: The model to use
+            tone: The tone/style to use
+            custom_instructions: Optional custom instructions
+            temperature: Temperature for generation
+            
+        Returns:
+            Generated brochure content
+        """
+        try:
+            messages = self._build_brochure_messages(company_name, content, tone, custom_instructions)
+            
+            # Identical requests are served from the cache without calling the API
+            cache_key = self._brochure_cache_key(model_key, temperature, messages)
+            cached = self._get_cached_brochure(cache_key)
+            if cached is not None:
+                return cached
+            
+            client = self._get_async_client(model_key)
+            provider = Config.MODELS.get(model_key, Config.MODELS[Config.GEMINI_MODEL])["provider"]
+            
+            response = await self._create_completion_async(
+                client,
+                provider,
+                model=model_key,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=Config.MAX_TOKENS
+            )
+            
+            result = response.choices[0].message.content
+            if result:
+                self._add_brochure_to_cache(cache_key, result)
+            return result if result else ""
+            
         except Exception as e:
-            raise Exception(f"Error generating brochure stream: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Error generating brochure: {str(e)}")
\ No newline at end of file
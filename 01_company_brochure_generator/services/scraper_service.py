@@ -1,79 +1,346 @@
 """Enhanced web scraping service for the Company Brochure Generator."""
 
+import heapq
+import html
+import logging
+import re
+import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 from bs4 import BeautifulSoup
-import requests
+import httpx
 
 from config import Config
 
+logger = logging.getLogger(__name__)
+
+# Prefer the C-based lxml parser when it is installed
+try:
+    import lxml  # noqa: F401
+    _HTML_PARSER = "lxml"
+except ImportError:
+    _HTML_PARSER = "html.parser"
+
+# Multiplex same-host page fetches over HTTP/2 when h2 is installed
+try:
+    import h2  # noqa: F401
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
+
+
+def _join_limited(strings, separator: str, limit: int) -> str:
+    """
+    Join strings lazily, stopping once the result reaches the length limit.
+    
+    Args:
+        strings: Iterable of strings to join
+        separator: Separator placed between strings
+        limit: Maximum length of the result
+        
+    Returns:
+        The joined string, truncated to the limit
+    """
+    parts = []
+    length = -len(separator)  # no separator before the first string
+    for string in strings:
+        if length >= limit:
+            break
+        parts.append(string)
+        length += len(separator) + len(string)
+    return separator.join(parts)[:limit]
+
+
+# Patterns for the text-only fast path, which avoids building a DOM
+_CHARSET_RE = re.compile(r'charset=["\']?([\w-]+)', re.I)
+_META_CHARSET_RE = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.I)
+# Tag attributes, where quoted values may contain ">"; a bare "<" ends the
+# attempt so a stray "<" cannot make every later tag scan the rest of the page
+_ATTRS = r'(?:[^<>"\']|"[^"]*"|\'[^\']*\')*'
+# The title stops at the next tag, so unclosed titles cannot scan the rest of the page
+_TITLE_RE = re.compile(
+    r'<title\b' + _ATTRS + r'>((?:[^<]|<(?![A-Za-z!/?]))*)</title\s*>',
+    re.I
+)
+_BODY_RE = re.compile(r'<body\b' + _ATTRS + r'>(.*?)(?:</body\s*>|\Z)', re.S | re.I)
+_SKIPPED_BLOCKS_RE = re.compile(
+    # Unterminated blocks (e.g. a page cut off by the download cap) run to the end
+    r'<!--.*?(?:-->|\Z)|<(script|style)\b' + _ATTRS + r'>.*?(?:</\1\s*>|\Z)',
+    re.S | re.I
+)
+# Like a parser, a "<" that does not start a tag (e.g. "margins < 5%") is text
+_TAG_RE = re.compile(r'<[A-Za-z!/?]' + _ATTRS + '>')
+
+# Content types that are parsed; other responses (PDFs, images, ...) are not downloaded
+_HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+
+
+def _read_limited(response: httpx.Response, limit: int) -> bytes:
+    """
+    Read a streamed response body, stopping once the limit is reached.
+    
+    Args:
+        response: A response sent with stream=True
+        limit: Maximum number of bytes to read
+        
+    Returns:
+        The body, truncated to at most limit bytes
+    """
+    buffer = bytearray()
+    for chunk in response.iter_bytes(65536):
+        buffer += chunk
+        if len(buffer) >= limit:
+            break
+    return bytes(buffer[:limit])
+
+
+def _decode_html(content: bytes, content_type: str) -> str:
+    """
+    Decode an HTML document using the declared charset, defaulting to UTF-8.
+    
+    Args:
+        content: Raw response body
+        content_type: The response Content-Type header
+        
+    Returns:
+        Decoded document
+    """
+    match = _CHARSET_RE.search(content_type) or _META_CHARSET_RE.search(content[:4096])
+    encoding = match.group(1) if match else "utf-8"
+    if isinstance(encoding, bytes):
+        encoding = encoding.decode("ascii")
+    
+    try:
+        return content.decode(encoding, errors="replace")
+    except LookupError:
+        return content.decode("utf-8", errors="replace")
+
+
+def _extract_content_fast(document: str) -> str:
+    """
+    Extract the title and body text of a page with regexes instead of a parser.
+    
+    Mirrors _extract_content: script and style blocks are dropped and the
+    remaining text nodes are stripped and joined by newlines. Documents
+    without a <body> tag use everything outside <head> and <title>.
+    
+    Args:
+        document: The HTML document
+        
+    Returns:
+        Title and text, truncated to Config.MAX_CONTENT_LENGTH
+    """
+    title_match = _TITLE_RE.search(document)
+    title = html.unescape(title_match.group(1)) if title_match and title_match.group(1) else "No title found"
+    header = title + "\n\n"
+    
+    body_match = _BODY_RE.search(document)
+    if body_match:
+        body = body_match.group(1)
+    else:
+        # Apart from the title, <head> only holds script and style text, removed below
+        body = _TITLE_RE.sub(" ", document)
+    
+    body = _SKIPPED_BLOCKS_RE.sub(" ", body)
+    strings = (
+        string
+        for string in (html.unescape(fragment).strip() for fragment in _TAG_RE.split(body))
+        if string
+    )
+    text = _join_limited(strings, "\n", max(0, Config.MAX_CONTENT_LENGTH - len(header)))
+    
+    return (header + text)[:Config.MAX_CONTENT_LENGTH]
+
+
+def _extract_content(soup: BeautifulSoup) -> str:
+    """
+    Extract the title and body text of a parsed page.
+    
+    Script, style, image and input elements are removed from the tree.
+    Documents without a <body> (possible with html.parser) use everything
+    outside <head> and <title>.
+    
+    Args:
+        soup: The parsed page
+        
+    Returns:
+        Title and text, truncated to Config.MAX_CONTENT_LENGTH
+    """
+    title = soup.title.string if soup.title else None
+    if title is None:
+        title = "No title found"
+    
+    # Extract only as much text as fits after the title
+    header = title + "\n\n"
+    root = soup.body
+    irrelevant_tags = ["script", "style", "img", "input"]
+    if root is None:
+        root = soup
+        irrelevant_tags += ["head", "title"]
+    
+    # Remove irrelevant elements
+    for irrelevant in root(irrelevant_tags):
+        irrelevant.decompose()
+    text = _join_limited(
+        root.stripped_strings,
+        "\n",
+        max(0, Config.MAX_CONTENT_LENGTH - len(header))
+    )
+    
+    return (header + text)[:Config.MAX_CONTENT_LENGTH]
+
 
 class ScraperService:
     """Service for scraping website content and links with caching and retry logic."""
     
     def __init__(self):
         """Initialize the scraper service."""
-        self.cache = {}
+        # LRU cache of scraped pages, bounded by Config.CACHE_MAX_ENTRIES
+        self.cache: OrderedDict[tuple[str, bool], tuple] = OrderedDict()
+        # Min-heap of (expires_at, key) so expired entries are purged without a full scan
+        self._expiry_heap: list[tuple[float, tuple[str, bool]]] = []
+        self._cache_lock = threading.Lock()
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/117.0.0.0 Safari/537.36"
         }
+        
+        # Keep-alive client so pages on the same host share a warm connection;
+        # retries are handled by _fetch_with_retry
+        self.client = httpx.Client(
+            http2=_HTTP2_AVAILABLE,
+            headers=self.headers,
+            timeout=Config.REQUEST_TIMEOUT,
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+            follow_redirects=True
+        )
+        
+        # Shared worker pool for fetching several pages concurrently
+        self.executor = ThreadPoolExecutor(max_workers=Config.SCRAPER_CONCURRENCY)
+    
+    @staticmethod
+    def _retention(validators: dict) -> float:
+        """How long an entry is kept: past expiry if it can be revalidated cheaply."""
+        return Config.CACHE_REVALIDATE_TIMEOUT if validators else Config.CACHE_TIMEOUT
     
-    def _get_from_cache(self, url: str) -> Optional[tuple]:
+    def _get_from_cache(self, url: str, only_content: bool = False) -> Optional[tuple]:
         """
-        Get content from cache if available and not expired.
+        Get a cache entry, fresh or stale.
+        
+        Entries are fresh for Config.CACHE_TIMEOUT. Entries with an ETag or
+        Last-Modified validator are kept, stale, for up to
+        Config.CACHE_REVALIDATE_TIMEOUT so they can be revalidated with a
+        conditional request. A full entry (content and links) also satisfies a
+        content-only lookup.
         
         Args:
             url: The URL to check in cache
+            only_content: Whether the caller only needs the page content
             
         Returns:
-            Cached content tuple or None if not cached/expired
+            Tuple of (content tuple, is_fresh, conditional request headers) or None if not cached
         """
-        if url in self.cache:
-            content, timestamp = self.cache[url]
-            if time.time() - timestamp < Config.CACHE_TIMEOUT:
-                return content
-            else:
-                # Remove expired cache entry
-                del self.cache[url]
-        return None
+        keys = [(url, True), (url, False)] if only_content else [(url, False)]
+        now = time.time()
+        stale = None
+        
+        with self._cache_lock:
+            for key in keys:
+                if key in self.cache:
+                    content, timestamp, validators = self.cache[key]
+                    age = now - timestamp
+                    if age < self._retention(validators):
+                        self.cache.move_to_end(key)
+                        if only_content:
+                            content = (content[0], [])
+                        if age < Config.CACHE_TIMEOUT:
+                            return content, True, validators
+                        # Keep looking: a fresh entry under another key avoids revalidation
+                        if stale is None:
+                            stale = (content, False, validators)
+                    else:
+                        # Remove expired cache entry
+                        del self.cache[key]
+        return stale
     
-    def _add_to_cache(self, url: str, content: tuple):
+    def _add_to_cache(
+        self,
+        url: str,
+        content: tuple,
+        only_content: bool = False,
+        validators: Optional[dict] = None
+    ):
         """
-        Add content to cache with timestamp.
+        Add content to cache with timestamp, evicting the least recently used
+        entry when the cache is full.
         
         Args:
             url: The URL to cache
             content: The content tuple to cache
+            only_content: Whether the content tuple was fetched without links
+            validators: Conditional request headers (If-None-Match / If-Modified-Since) for revalidation
         """
-        self.cache[url] = (content, time.time())
+        key = (url, only_content)
+        validators = validators or {}
+        now = time.time()
+        with self._cache_lock:
+            self._purge_expired(now)
+            self.cache[key] = (content, now, validators)
+            self.cache.move_to_end(key)
+            heapq.heappush(self._expiry_heap, (now + self._retention(validators), key))
+            if len(self.cache) > Config.CACHE_MAX_ENTRIES:
+                self.cache.popitem(last=False)
     
-    def _fetch_with_retry(self, url: str) -> Optional[requests.Response]:
+    def _purge_expired(self, now: float):
+        """
+        Remove expired cache entries, including ones that are never looked up again.
+        
+        Only expired heap entries are visited, so the cost is O(k log n) for k
+        expired entries. Must be called with the cache lock held.
+        
+        Args:
+            now: The current time
+        """
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            _, key = heapq.heappop(self._expiry_heap)
+            entry = self.cache.get(key)
+            # Skip keys that were evicted or re-cached since this heap entry was pushed
+            if entry and now - entry[1] >= self._retention(entry[2]):
+                del self.cache[key]
+    
+    def _fetch_with_retry(
+        self,
+        url: str,
+        headers: Optional[dict] = None
+    ) -> Optional[httpx.Response]:
         """
         Fetch URL with exponential backoff retry logic.
         
         Args:
             url: The URL to fetch
+            headers: Optional extra request headers (e.g. conditional request headers)
             
         Returns:
-            Response object or None if all retries failed
+            Streamed response object (to be closed by the caller) or None if all retries failed
         """
         for attempt in range(Config.MAX_RETRIES):
             try:
-                response = requests.get(
-                    url,
-                    headers=self.headers,
-                    timeout=Config.REQUEST_TIMEOUT
-                )
-                response.raise_for_status()
+                # Stream so the body is only downloaded if the caller wants it
+                request = self.client.build_request("GET", url, headers=headers)
+                response = self.client.send(request, stream=True)
+                if response.is_error:
+                    response.close()
+                    response.raise_for_status()
                 return response
                 
-            except requests.exceptions.Timeout:
+            except httpx.TimeoutException:
                 if attempt < Config.MAX_RETRIES - 1:
                     time.sleep(2 ** attempt)  # Exponential backoff
                     continue
                 raise Exception(f"Timeout after {Config.MAX_RETRIES} attempts")
                 
-            except requests.exceptions.RequestException as e:
+            except httpx.HTTPError as e:
                 if attempt < Config.MAX_RETRIES - 1:
                     time.sleep(2 ** attempt)
                     continue
@@ -81,6 +348,26 @@ class ScraperService:
         
         return None
     
+    @staticmethod
+    def _get_validators(response: httpx.Response) -> dict:
+        """
+        Build conditional request headers from a response's cache validators.
+        
+        Args:
+            response: The response to read ETag and Last-Modified from
+            
+        Returns:
+            Dictionary of If-None-Match / If-Modified-Since headers that are available
+        """
+        return {
+            header: value
+            for header, value in (
+                ("If-None-Match", response.headers.get("ETag")),
+                ("If-Modified-Since", response.headers.get("Last-Modified"))
+            )
+            if value
+        }
+    
     def fetch_website_content_and_links(
         self,
         url: str,
@@ -97,46 +384,57 @@ class ScraperService:
             Tuple of (content, links) where content is truncated text and links is list of URLs
         """
         # Check cache first
-        cached = self._get_from_cache(url)
-        if cached:
-            return cached
+        cached = self._get_from_cache(url, only_content)
+        if cached and cached[1]:
+            return cached[0]
+        
+        # A stale entry with validators is revalidated with a conditional request
+        conditional_headers = cached[2] if cached else None
         
         try:
             # Fetch the page
-            response = self._fetch_with_retry(url)
+            response = self._fetch_with_retry(url, conditional_headers)
             if not response:
                 return "", []
             
-            # Parse HTML
-            soup = BeautifulSoup(response.content, "html.parser")
+            try:
+                # Not modified: reuse the cached result without downloading or parsing
+                if cached and response.status_code == 304:
+                    self._add_to_cache(url, cached[0], only_content, cached[2])
+                    return cached[0]
+                
+                validators = self._get_validators(response)
+                content_type = response.headers.get("Content-Type", "")
+                
+                # Skip non-HTML bodies without downloading them
+                if content_type and not content_type.lower().startswith(_HTML_CONTENT_TYPES):
+                    result = ("", [])
+                    self._add_to_cache(url, result, only_content, validators)
+                    return result
+                
+                body = _read_limited(response, Config.MAX_DOWNLOAD_BYTES)
+            finally:
+                response.close()
             
-            # Extract title
-            title = soup.title.string if soup.title else "No title found"
-            if title is None:
-                title = "No title found"
+            if only_content:
+                # Text-only fast path: no DOM is needed when links are not extracted
+                result = (_extract_content_fast(_decode_html(body, content_type)), [])
+                self._add_to_cache(url, result, only_content, validators)
+                return result
             
-            # Extract text content
-            text = ""
-            if soup.body:
-                # Remove irrelevant elements
-                for irrelevant in soup.body(["script", "style", "img", "input"]):
-                    irrelevant.decompose()
-                text = soup.body.get_text(separator="\n", strip=True)
+            # Parse HTML
+            soup = BeautifulSoup(body, _HTML_PARSER)
             
-            # Truncate content
-            content = (title + "\n\n" + text)[:Config.MAX_CONTENT_LENGTH]
+            # Extract title and text
+            content = _extract_content(soup)
             
-            # Extract links if needed
-            links: list[str] = []
-            if not only_content:
-                all_links = [link.get("href") for link in soup.find_all("a")]
-                # Filter out None and empty links, ensure they are strings
-                links = [str(link) for link in all_links if link and isinstance(link, str)]
+            # Extract links; anchors without an href are skipped by the selector
+            links = [anchor["href"] for anchor in soup.select("a[href]") if anchor["href"]]
             
             result = (content, links)
             
-            # Cache the result
-            self._add_to_cache(url, result)
+            # Cache the result with its validators for later revalidation
+            self._add_to_cache(url, result, only_content, validators)
             
             return result
             
@@ -161,23 +459,40 @@ class ScraperService:
         if max_length is None:
             max_length = Config.MAX_AGGREGATED_CONTENT
         
-        aggregated = ""
+        # Fetch all pages concurrently, then aggregate in the original order
+        futures = [
+            self.executor.submit(self.fetch_website_content_and_links, url, True)
+            for url in urls
+        ]
+        
+        parts = []
+        aggregated_length = 0
         
-        for url in urls:
-            if len(aggregated) >= max_length:
-                break
+        for url, future in zip(urls, futures):
+            if aggregated_length >= max_length:
+                # Enough content; skip pages that have not started yet
+                future.cancel()
+                continue
             
             try:
-                content, _ = self.fetch_website_content_and_links(url, only_content=True)
-                remaining = max_length - len(aggregated)
-                aggregated += content[:remaining] + "\n\n"
+                content, _ = future.result()
+                part = content[:max_length - aggregated_length] + "\n\n"
+                parts.append(part)
+                aggregated_length += len(part)
             except Exception as e:
                 # Log error but continue with other URLs
-                print(f"Warning: Failed to fetch {url}: {str(e)}")
+                logger.warning("Failed to fetch %s: %s", url, e)
                 continue
         
-        return aggregated.strip()
+        return "".join(parts).strip()
     
     def clear_cache(self):
         """Clear all cached content."""
-        self.cache.clear()
\ No newline at end of file
+        with self._cache_lock:
+            self.cache.clear()
+            self._expiry_heap.clear()
+    
+    def close(self):
+        """Release pooled connections and worker threads."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.client.close()
\ No newline at end of file
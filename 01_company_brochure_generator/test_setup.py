@@ -70,6 +70,40 @@ def test_validators():
     assert valid, "Valid name should pass"
     print("✓ Company name validation works")
 
+def test_scraper_extraction():
+    """Test that the text-only fast path matches the full HTML parse."""
+    print("\nTesting scraper text extraction...")
+    import time
+    from bs4 import BeautifulSoup
+    from services.scraper_service import _HTML_PARSER, _extract_content, _extract_content_fast
+    
+    documents = [
+        '<html><head><title>Acme</title></head><body>'
+        '<div x-show="count > 0" class="a">Our mission</div></body></html>',
+        '<html><head><title>Acme</title></head><body>'
+        '<p>Our margins < 5% for peers, yet we lead.</p></body></html>',
+        '<title>Acme &amp; Co</title><h1>About</h1><p>We build things.</p>',
+        '<html><head><title>Acme</title><style>p {}</style></head><body><h1>Hi</h1>'
+        '<script>var x = "<p>";</script><p>Hello <b>world</b> &eacute;!</p><!-- note --></body></html>',
+        # Cut off inside a trailing script, as the download cap can do
+        '<html><head><title>T</title></head><body><p>About us</p>'
+        '<script>window.__DATA__={"a":1};' + 'if (a<b && c>d) {}' * 1000,
+    ]
+    for document in documents:
+        expected = _extract_content(BeautifulSoup(document, _HTML_PARSER))
+        actual = _extract_content_fast(document)
+        assert actual == expected, f"Fast path mismatch: {actual!r} != {expected!r}"
+    print("✓ Fast text extraction matches the HTML parser")
+    
+    # Malformed markup must not make the regexes scan the page once per tag
+    malformed = ['<a' * 50000, '<a "' * 50000, '<title>' * 50000, '<!-- ' + '<p>x</p>' * 20000]
+    for document in malformed:
+        start = time.perf_counter()
+        _extract_content_fast(document)
+        elapsed = time.perf_counter() - start
+        assert elapsed < 1, f"Fast path took {elapsed:.1f}s on malformed markup"
+    print("✓ Fast text extraction stays linear on malformed markup")
+
 def test_services():
     """Test service initialization."""
     print("\nTesting service initialization...")
@@ -109,6 +143,7 @@ def main():
     
     test_config()
     test_validators()
+    test_scraper_extraction()
     services_ok = test_services()
     
     print("\n" + "=" * 60)
@@ -0,0 +1,28 @@
+"""CSS utilities for the Company Brochure Generator."""
+
+import re
+
+_COMMENT_RE = re.compile(r'/\*.*?\*/', re.S)
+_WHITESPACE_RE = re.compile(r'\s+')
+_PUNCTUATION_SPACE_RE = re.compile(r'\s*([{};,>])\s*')
+_COLON_SPACE_RE = re.compile(r':\s+')
+
+
+def minify_css(css: str) -> str:
+    """
+    Minify a stylesheet by removing comments and redundant whitespace.
+    
+    Args:
+        css: The stylesheet source
+    
+    Returns:
+        Minified stylesheet
+    """
+    css = _COMMENT_RE.sub('', css)
+    css = _WHITESPACE_RE.sub(' ', css)
+    css = _PUNCTUATION_SPACE_RE.sub(r'\1', css)
+    # Only drop spaces after colons; a space before one is a descendant selector
+    css = _COLON_SPACE_RE.sub(':', css)
+    
+    # The last declaration in a block does not need a semicolon
+    return css.replace(';}', '}').strip()
@@ -1,5 +1,28 @@
 """Prompt templates for the Company Brochure Generator."""
 
+import re
+from urllib.parse import urlsplit
+
+from config import Config
+
+# Links that never belong in a brochure, dropped before they cost prompt tokens
+_SKIP_LINK_RE = re.compile(
+    r'^(mailto|tel|javascript):'
+    r'|\.(pdf|jpe?g|png|gif|svg|zip)([?#]|$)',
+    re.I
+)
+# Irrelevant pages, matched against whole segments of the URL path only, so that
+# hosts, query strings and content pages (e.g. /blog/why-we-care-about-privacy,
+# /products/shopping-cart-software) do not trigger it
+_SKIP_PATH_RE = re.compile(
+    r'(?:^|/)(?:'
+    r'(?:privacy|terms|cookies?)'
+    r'(?:[-_](?:policy|notice|statement|settings|preferences|of[-_](?:use|service)|and[-_]conditions))?'
+    r'|login|log-in|signin|sign-in|cart'
+    r')(?:\.\w+)?(?=/|$)',
+    re.I
+)
+
 # System prompt for link selection
 LINK_SELECTION_SYSTEM_PROMPT = """
 You are provided with a list of links found on a webpage.
@@ -18,6 +41,29 @@ You should respond in JSON as in this example:
 """
 
 
+# System prompt for selecting links for several websites in one request
+BATCH_LINK_SELECTION_SYSTEM_PROMPT = """
+You are provided with numbered lists of links, each found on a different company website.
+
+For each website, you are able to decide which of the links would be most relevant to include in a brochure
+about that company, such as links to an About page, or a Company page, or Careers/Jobs pages.
+
+You should respond in JSON as in this example, with one entry per website using its number as the index:
+
+{
+    "sites": [
+        {
+            "index": 1,
+            "links": [
+                {"type": "about page", "url": "https://full.url/goes/here/about"},
+                {"type": "careers page", "url": "https://another.full.url/careers"}
+            ]
+        }
+    ]
+}
+"""
+
+
 # Base system prompt for brochure generation
 BASE_BROCHURE_SYSTEM_PROMPT = """
 You are an assistant that analyzes the contents of several relevant pages from a company website
@@ -58,6 +104,39 @@ Keep it brief and impactful, highlighting only the most critical information.
 """
 }
 
+# Complete brochure system prompt for each tone, built once at import
+BROCHURE_SYSTEM_PROMPTS = {
+    tone: BASE_BROCHURE_SYSTEM_PROMPT + "\n" + tone_addition
+    for tone, tone_addition in TONE_PROMPTS.items()
+}
+
+
+def _is_skipped_link(link: str) -> bool:
+    """Whether a link is empty or can never be relevant to a brochure."""
+    if not link or _SKIP_LINK_RE.search(link):
+        return True
+    try:
+        path = urlsplit(link).path
+    except ValueError:
+        # Malformed links (e.g. an unclosed IPv6 bracket) are checked as a whole
+        path = link
+    return bool(_SKIP_PATH_RE.search(path))
+
+
+def _filter_links(links: list[str]) -> list[str]:
+    """
+    Deduplicate links and drop irrelevant ones, keeping at most
+    Config.MAX_LINKS_FOR_SELECTION in their original order.
+    
+    Args:
+        links: List of links found on the page
+        
+    Returns:
+        Filtered list of links
+    """
+    filtered = [link for link in dict.fromkeys(links) if not _is_skipped_link(link)]
+    return filtered[:Config.MAX_LINKS_FOR_SELECTION]
+
 
 def get_link_selection_user_prompt(url: str, links: list[str]) -> str:
     """
@@ -79,10 +158,36 @@ Do not include Terms of Service, Privacy, email links.
 Links (some might be relative links):
 
 """
-    user_prompt += "\n".join(links)
+    user_prompt += "\n".join(_filter_links(links))
     return user_prompt
 
 
+def get_batch_link_selection_user_prompt(sites: list[tuple[str, list[str]]]) -> str:
+    """
+    Generate the user prompt for selecting links for several websites at once.
+    
+    Args:
+        sites: List of (website URL, links found on the page) tuples, numbered from 1
+        
+    Returns:
+        Formatted user prompt
+    """
+    user_prompt = """
+Below are the links found on several websites, one numbered section per website.
+For each website, decide which links are relevant web links for a brochure about that company.
+Respond with the full https URLs in JSON format, keyed by the website number.
+Do not include Terms of Service, Privacy, email links.
+
+Links (some might be relative links):
+
+"""
+    sections = [
+        f"### Site {index}: {url}\n" + "\n".join(_filter_links(links)) + "\n---"
+        for index, (url, links) in enumerate(sites, start=1)
+    ]
+    return user_prompt + "\n".join(sections)
+
+
 def get_brochure_system_prompt(tone: str = "professional") -> str:
     """
     Generate the system prompt for brochure generation based on tone.
@@ -93,8 +198,17 @@ def get_brochure_system_prompt(tone: str = "professional") -> str:
     Returns:
         Complete system prompt
     """
-    tone_addition = TONE_PROMPTS.get(tone, TONE_PROMPTS["professional"])
-    return BASE_BROCHURE_SYSTEM_PROMPT + "\n" + tone_addition
+    return BROCHURE_SYSTEM_PROMPTS.get(tone, BROCHURE_SYSTEM_PROMPTS["professional"])
+
+
+# Opening of the brochure user prompt, filled in with the company name
+BROCHURE_USER_PROMPT_TEMPLATE = """
+You are looking at a company called: {company_name}
+
+Here are the contents of its landing page and other relevant pages;
+use this information to build a short brochure of the company in markdown without code blocks.
+
+"""
 
 
 def get_brochure_user_prompt(
@@ -113,17 +227,9 @@ def get_brochure_user_prompt(
     Returns:
         Formatted user prompt
     """
-    user_prompt = f"""
-You are looking at a company called: {company_name}
-
-Here are the contents of its landing page and other relevant pages;
-use this information to build a short brochure of the company in markdown without code blocks.
-
-"""
+    user_prompt = BROCHURE_USER_PROMPT_TEMPLATE.format(company_name=company_name)
     
     if custom_instructions:
         user_prompt += f"\nAdditional instructions: {custom_instructions}\n\n"
     
-    user_prompt += content
-    
-    return user_prompt
\ No newline at end of file
+    return user_prompt + content
\ No newline at end of file
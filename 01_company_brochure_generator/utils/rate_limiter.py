@@ -0,0 +1,72 @@
+"""Rate limiting utilities for the Company Brochure Generator."""
+
+import asyncio
+import threading
+import time
+import weakref
+
+
+class AsyncTokenBucket:
+    """Token bucket for throttling async API calls to a per-minute budget."""
+    
+    def __init__(self, rate_per_min: float, capacity: float):
+        """
+        Initialize the bucket full.
+        
+        Args:
+            rate_per_min: Tokens added to the bucket per minute
+            capacity: Maximum number of tokens the bucket can hold
+        """
+        self.rate_per_sec = rate_per_min / 60
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        # The token budget is shared by event loops on different threads
+        self._state_lock = threading.Lock()
+        # asyncio locks bind to one event loop, so each running loop gets its own;
+        # it keeps waiters within a loop in arrival order
+        self._locks: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, asyncio.Lock
+        ] = weakref.WeakKeyDictionary()
+    
+    def _get_lock(self) -> asyncio.Lock:
+        """Get the lock for the running event loop, creating it on first use."""
+        loop = asyncio.get_running_loop()
+        lock = self._locks.get(loop)
+        if lock is None:
+            lock = self._locks[loop] = asyncio.Lock()
+        return lock
+    
+    def _refill(self):
+        """Add the tokens accumulated since the last refill. Must be called with the state lock held."""
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate_per_sec)
+        self._updated_at = now
+    
+    async def acquire(self, amount: float = 1):
+        """
+        Wait until the requested tokens are available and take them.
+        
+        Waiters are served in arrival order. Requests larger than the capacity
+        are capped to it so they can eventually proceed.
+        
+        Args:
+            amount: Number of tokens to take
+        """
+        amount = min(amount, self.capacity)
+        
+        async with self._get_lock():
+            while True:
+                with self._state_lock:
+                    self._refill()
+                    if self._tokens >= amount:
+                        self._tokens -= amount
+                        return
+                    delay = (amount - self._tokens) / self.rate_per_sec
+                await asyncio.sleep(delay)
+    
+    def drain(self):
+        """Empty the bucket, e.g. after the server reports a rate limit."""
+        with self._state_lock:
+            self._refill()
+            self._tokens = 0
@@ -1,13 +1,20 @@
 """Validation utilities for the Company Brochure Generator."""
 
 import re
+from functools import lru_cache
 from urllib.parse import urlparse
 
+_HTML_TAG_RE = re.compile(r'<[^>]+>')
+_WHITESPACE_RE = re.compile(r'\s+')
 
+
+@lru_cache(maxsize=1024)
 def validate_url(url: str) -> tuple[bool, str]:
     """
     Validate and normalize a URL.
     
+    Results are memoized since the UI often re-submits the same URL.
+    
     Args:
         url: The URL to validate
         
@@ -84,12 +91,10 @@ def sanitize_text(text: str) -> str:
         return ""
     
     # Remove any HTML tags
-    text = re.sub(r'<[^>]+>', '', text)
+    text = _HTML_TAG_RE.sub('', text)
     
     # Remove excessive whitespace
-    text = ' '.join(text.split())
-    
-    return text
+    return _WHITESPACE_RE.sub(' ', text).strip()
 
 
 def validate_temperature(temp: float) -> tuple[bool, str]: